@@ -1,8 +1,20 @@
 import os
 import sys
 import json
+import functools
+import hashlib
+import io
 import logging
+import mmap
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import httpx
+import numpy as np
 from openai import OpenAI
 from qdrant_client import QdrantClient
 
@@ -16,30 +28,73 @@ logging.basicConfig(
 )
 logging.debug("MCP server starting...")
 
+# -----------------------
+# JSON
+# -----------------------
+# orjson is much faster than the stdlib for the large tool responses; both
+# paths emit compact UTF-8 bytes rather than \uXXXX escapes
+try:
+    import orjson
+
+    json_dumps = orjson.dumps
+    json_loads = orjson.loads
+    logging.debug("Using orjson for JSON serialization")
+except ImportError:
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    json_loads = json.loads
+    logging.debug("orjson not available, using json for serialization")
+
 # -----------------------
 # CONFIG
 # -----------------------
 QDRANT_URL = os.environ.get("QDRANT_URL", "http://127.0.0.1:6333")
+QDRANT_GRPC_PORT = int(os.environ.get("QDRANT_GRPC_PORT", "6334"))
+QDRANT_PREFER_GRPC = os.environ.get("QDRANT_PREFER_GRPC", "true").lower() in ("1", "true", "yes")
 COLLECTION = os.environ.get("COLLECTION_NAME", "bevy-0-14-2")
 EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "text-embedding-embeddinggemma-300m@bf16")
 LM_STUDIO_URL = os.environ.get("LM_STUDIO_URL", "http://127.0.0.1:1234/v1")
 LM_STUDIO_API_KEY = os.environ.get("LM_STUDIO_API_KEY", "lm-studio")
 BEVY_SOURCE_PATH = os.environ.get("BEVY_SOURCE_PATH", "C:\\path\\to\\bevy-0.14.2")
 MIN_RELEVANCE_SCORE = float(os.environ.get("MIN_RELEVANCE_SCORE", "0.5"))  # Filter low scores
+EMBED_CACHE_PATH = os.environ.get("EMBED_CACHE_PATH", "embed-cache.sqlite3")
+QUERY_CACHE_SIZE = int(os.environ.get("QUERY_CACHE_SIZE", "256"))
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.97"))  # Cosine similarity for reuse
+QUERY_CACHE_TTL = float(os.environ.get("QUERY_CACHE_TTL", "300"))  # Seconds before cached results are refetched
+FILE_READ_WORKERS = int(os.environ.get("FILE_READ_WORKERS", "8"))
+# Total characters of source text kept in memory; resident size is at most
+# ~4 bytes per character, so the 16M default stays well under 64 MiB
+FILE_CACHE_MAX_CHARS = int(os.environ.get("FILE_CACHE_MAX_CHARS", str(16 * 1024 * 1024)))
+MMAP_MIN_BYTES = int(os.environ.get("MMAP_MIN_BYTES", str(1024 * 1024)))  # Files this large are searched via mmap
 
 logging.debug(f"Config - QDRANT_URL: {QDRANT_URL}")
+logging.debug(f"Config - QDRANT_GRPC_PORT: {QDRANT_GRPC_PORT}")
+logging.debug(f"Config - QDRANT_PREFER_GRPC: {QDRANT_PREFER_GRPC}")
 logging.debug(f"Config - COLLECTION: {COLLECTION}")
 logging.debug(f"Config - EMBEDDING_MODEL: {EMBEDDING_MODEL}")
 logging.debug(f"Config - LM_STUDIO_URL: {LM_STUDIO_URL}")
 logging.debug(f"Config - BEVY_SOURCE_PATH: {BEVY_SOURCE_PATH}")
 logging.debug(f"Config - MIN_RELEVANCE_SCORE: {MIN_RELEVANCE_SCORE}")
+logging.debug(f"Config - EMBED_CACHE_PATH: {EMBED_CACHE_PATH}")
+logging.debug(f"Config - QUERY_CACHE_SIZE: {QUERY_CACHE_SIZE}")
+logging.debug(f"Config - SEMANTIC_CACHE_THRESHOLD: {SEMANTIC_CACHE_THRESHOLD}")
+logging.debug(f"Config - QUERY_CACHE_TTL: {QUERY_CACHE_TTL}")
+logging.debug(f"Config - FILE_READ_WORKERS: {FILE_READ_WORKERS}")
+logging.debug(f"Config - FILE_CACHE_MAX_CHARS: {FILE_CACHE_MAX_CHARS}")
+logging.debug(f"Config - MMAP_MIN_BYTES: {MMAP_MIN_BYTES}")
 
 # -----------------------
 # CLIENTS
 # -----------------------
 try:
-    lm_client = OpenAI(base_url=LM_STUDIO_URL, api_key=LM_STUDIO_API_KEY)
-    qdrant = QdrantClient(url=QDRANT_URL, prefer_grpc=False)
+    # Keep connections to LM Studio alive between queries
+    lm_client = OpenAI(
+        base_url=LM_STUDIO_URL,
+        api_key=LM_STUDIO_API_KEY,
+        http_client=httpx.Client(limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=60))
+    )
+    qdrant = QdrantClient(url=QDRANT_URL, prefer_grpc=QDRANT_PREFER_GRPC, grpc_port=QDRANT_GRPC_PORT)
     logging.debug("Clients initialized successfully")
 except Exception as e:
     logging.error(f"Failed to initialize clients: {e}")
@@ -48,35 +103,47 @@ except Exception as e:
 # -----------------------
 # FILE FILTERING
 # -----------------------
-def is_relevant_file(file_path: str, query: str) -> tuple[bool, str]:
+# Prioritize core ECS and API files over examples
+PRIORITY_PATHS = (
+    'crates/bevy_ecs',
+    'crates/bevy_app',
+    'crates/bevy_core',
+    'src/',
+)
+
+# Deprioritize but don't exclude examples
+EXAMPLE_PATHS = ('examples/', 'benches/', 'tests/')
+
+# Query terms that make example files worth returning
+ECS_TERMS = ('entity', 'component', 'system', 'query', 'resource', 'world', 'commands')
+RENDERING_TERMS = ('render', 'mesh', 'material', 'shader', 'camera', 'light')
+
+# Case-insensitive alternations avoid allocating lowercased copies of every
+# path and query
+PRIORITY_RE = re.compile('|'.join(map(re.escape, PRIORITY_PATHS)), re.IGNORECASE)
+EXAMPLE_RE = re.compile('|'.join(map(re.escape, EXAMPLE_PATHS)), re.IGNORECASE)
+ECS_RE = re.compile('|'.join(map(re.escape, ECS_TERMS)), re.IGNORECASE)
+RENDERING_RE = re.compile('|'.join(map(re.escape, RENDERING_TERMS)), re.IGNORECASE)
+
+def query_flags(query: str) -> tuple[bool, bool]:
+    """
+    Classify a query once per search.
+    Returns (query_has_ecs, query_has_rendering)
+    """
+    query_has_ecs = ECS_RE.search(query) is not None
+    query_has_rendering = RENDERING_RE.search(query) is not None
+    return query_has_ecs, query_has_rendering
+
+@functools.lru_cache(maxsize=4096)
+def is_relevant_file(file_path: str, query_has_ecs: bool, query_has_rendering: bool) -> tuple[bool, str]:
     """
     Determine if a file is likely to contain relevant information.
     Returns (is_relevant, reason)
     """
-    path_lower = file_path.lower()
-    query_lower = query.lower()
-    
-    # Prioritize core ECS and API files over examples
-    priority_paths = [
-        'crates/bevy_ecs',
-        'crates/bevy_app',
-        'crates/bevy_core',
-        'src/',
-    ]
-    
-    # Deprioritize but don't exclude examples
-    example_paths = ['examples/', 'benches/', 'tests/']
-    
-    # Extract key terms from query
-    ecs_terms = ['entity', 'component', 'system', 'query', 'resource', 'world', 'commands']
-    rendering_terms = ['render', 'mesh', 'material', 'shader', 'camera', 'light']
-    
-    is_priority = any(p in path_lower for p in priority_paths)
-    is_example = any(p in path_lower for p in example_paths)
-    
-    # Check if query terms align with file path
-    query_has_ecs = any(term in query_lower for term in ecs_terms)
-    query_has_rendering = any(term in query_lower for term in rendering_terms)
+    # Prefixes can appear mid-path (e.g. a crate's src/), so this is a
+    # substring search rather than startswith
+    is_priority = PRIORITY_RE.search(file_path) is not None
+    is_example = EXAMPLE_RE.search(file_path) is not None
     
     if is_priority and not is_example:
         return True, "core API file"
@@ -90,6 +157,126 @@ def is_relevant_file(file_path: str, query: str) -> tuple[bool, str]:
 # -----------------------
 # FILE READING WITH CONTEXT EXTRACTION
 # -----------------------
+CONTEXT_LINES = 20        # Lines of context kept on each side of a match
+MAX_CONTEXT_MATCHES = 5   # Only the first few matches get a context window
+
+def _iter_lines(f):
+    """
+    Yield (line, raw_length) pairs with the same line boundaries as
+    content.split('\n'), where raw_length includes the newline.
+    """
+    line = ''
+    for line in f:
+        if line.endswith('\n'):
+            yield line[:-1], len(line)
+        else:
+            yield line, len(line)
+    if not line or line.endswith('\n'):
+        yield '', 0
+
+class FileTextCache:
+    """
+    LRU of source file text bounded by total characters rather than entry
+    count. Entries are keyed by path and remember the mtime they were read
+    at, so an edited file replaces its stale entry instead of sitting next
+    to it. Shared by the file-reading worker threads, hence the lock.
+    """
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.entries = OrderedDict()  # path -> (mtime_ns, text)
+        self.total_chars = 0
+        self.lock = threading.Lock()
+
+    def read(self, path: str, mtime_ns: int) -> str:
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry[0] == mtime_ns:
+                self.entries.move_to_end(path)
+                return entry[1]
+        
+        logging.debug(f"File cache miss: {path}")
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        
+        with self.lock:
+            old = self.entries.pop(path, None)
+            if old is not None:
+                self.total_chars -= len(old[1])
+            if len(text) <= self.max_chars:
+                self.entries[path] = (mtime_ns, text)
+                self.total_chars += len(text)
+            while self.total_chars > self.max_chars:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.total_chars -= len(evicted)
+        return text
+
+file_cache = FileTextCache(FILE_CACHE_MAX_CHARS)
+
+def _decode_window(data: bytes) -> str:
+    text = data.decode('utf-8').replace('\r\n', '\n')
+    return text[:-1] if text.endswith('\r') else text
+
+def _extract_with_mmap(full_path: Path, query_terms: list[str], max_chars: int):
+    """
+    Extract context around matches in a large file without reading it into
+    memory: search the mapped bytes case-insensitively and decode only the
+    context windows. Returns None if no query term occurs in the file.
+    """
+    if not query_terms:
+        return None
+    pattern = re.compile(b'|'.join(re.escape(term.encode('ascii')) for term in query_terms), re.IGNORECASE)
+    
+    with open(full_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        windows = []  # [start_offset, end_offset] of merged context windows
+        pos = 0
+        match_count = 0
+        while match_count < MAX_CONTEXT_MATCHES:
+            m = pattern.search(mm, pos)
+            if m is None:
+                break
+            match_count += 1
+            line_start = mm.rfind(b'\n', 0, m.start()) + 1
+            
+            # Walk back CONTEXT_LINES lines for the window start
+            start = line_start
+            for _ in range(CONTEXT_LINES):
+                if start == 0:
+                    break
+                start = mm.rfind(b'\n', 0, start - 1) + 1
+            
+            # Walk forward to the end of the last line in the window
+            next_start = line_start
+            for _ in range(CONTEXT_LINES):
+                newline = mm.find(b'\n', next_start)
+                if newline < 0:
+                    end = size
+                    break
+                end = newline
+                next_start = newline + 1
+            
+            # Overlapping or adjacent windows are joined into one
+            if windows and start <= windows[-1][1] + 1:
+                windows[-1][1] = end
+            else:
+                windows.append([start, end])
+            
+            # Resume searching on the next line so each line counts once
+            newline = mm.find(b'\n', m.start())
+            if newline < 0:
+                break
+            pos = newline + 1
+        
+        if not windows:
+            return None
+        extracted_content = '\n'.join(_decode_window(mm[start:end]) for start, end in windows)
+    
+    if len(extracted_content) < max_chars:
+        return extracted_content
+    else:
+        return extracted_content[:max_chars] + f"\n\n... (truncated)"
+
 def read_file_content(file_path: str, query: str, max_chars: int = 3000) -> str:
     """
     Read file content with smart extraction around relevant sections.
@@ -102,32 +289,72 @@ def read_file_content(file_path: str, query: str, max_chars: int = 3000) -> str:
             logging.warning(f"File not found: {full_path}")
             return f"*File not found at {full_path}*"
         
-        with open(full_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Try to find relevant sections based on query terms
         query_terms = query.lower().split()
-        lines = content.split('\n')
         
-        # Find lines containing query terms
-        relevant_line_indices = []
-        for i, line in enumerate(lines):
-            line_lower = line.lower()
-            if any(term in line_lower for term in query_terms):
-                relevant_line_indices.append(i)
+        # Large files are searched in place; only ASCII terms can be matched
+        # case-insensitively on raw bytes the same way str.lower() would.
+        # Over 4 bytes per max_chars the decoded file is always too long to
+        # return whole, so only the extraction path applies.
+        file_stat = full_path.stat()
+        file_size = file_stat.st_size
+        if file_size >= MMAP_MIN_BYTES and file_size > 4 * max_chars and all(term.isascii() for term in query_terms):
+            extracted_content = _extract_with_mmap(full_path, query_terms, max_chars)
+            if extracted_content is not None:
+                return extracted_content
+        
+        # One alternation compiled per call is a single C-level scan per line
+        # instead of one substring search per term
+        term_pattern = re.compile('|'.join(map(re.escape, query_terms)), re.IGNORECASE) if query_terms else None
         
-        # If we found relevant sections, extract context around them
-        if relevant_line_indices and len(content) > max_chars:
-            # Get context window around relevant lines (±20 lines)
-            context_lines = set()
-            for idx in relevant_line_indices[:5]:  # Limit to first 5 matches
-                start = max(0, idx - 20)
-                end = min(len(lines), idx + 20)
-                context_lines.update(range(start, end))
-            
-            # Sort and extract
-            sorted_lines = sorted(context_lines)
-            extracted_content = '\n'.join(lines[i] for i in sorted_lines)
+        head_lines = []        # Leading lines, kept for the plain truncation fallback
+        head_chars = 0
+        total_chars = 0
+        lookback = deque(maxlen=CONTEXT_LINES)  # (index, line) pairs before the current line
+        extracted_lines = []
+        extracted_chars = 0    # Length of the extracted lines, each counted with a trailing newline
+        match_count = 0
+        last_emitted = -1
+        emit_until = -1
+        
+        # Single streaming pass: find lines containing query terms and keep
+        # ±CONTEXT_LINES around the first MAX_CONTEXT_MATCHES of them
+        if file_size < MMAP_MIN_BYTES:
+            source = io.StringIO(file_cache.read(str(full_path), file_stat.st_mtime_ns))
+        else:
+            source = open(full_path, 'r', encoding='utf-8')
+        
+        with source as f:
+            for i, (line, raw_len) in enumerate(_iter_lines(f)):
+                total_chars += raw_len
+                if head_chars <= max_chars:
+                    head_lines.append(line)
+                    head_chars += raw_len
+                
+                is_match = match_count < MAX_CONTEXT_MATCHES and term_pattern is not None and term_pattern.search(line) is not None
+                if is_match:
+                    match_count += 1
+                    for j, previous in lookback:
+                        if j > last_emitted:
+                            extracted_lines.append(previous)
+                            extracted_chars += len(previous) + 1
+                    emit_until = max(emit_until, i + CONTEXT_LINES - 1)
+                
+                if i <= emit_until and extracted_chars <= max_chars:
+                    extracted_lines.append(line)
+                    extracted_chars += len(line) + 1
+                    last_emitted = i
+                
+                lookback.append((i, line))
+                
+                # Once the extraction is settled and the file is known to be
+                # too large to return whole, the rest of the file is irrelevant
+                extraction_done = extracted_chars > max_chars or (match_count >= MAX_CONTEXT_MATCHES and i >= emit_until)
+                if extraction_done and total_chars > max_chars:
+                    break
+        
+        # If we found relevant sections, return the context around them
+        if match_count and total_chars > max_chars:
+            extracted_content = '\n'.join(extracted_lines)
             
             if len(extracted_content) < max_chars:
                 return extracted_content
@@ -135,8 +362,9 @@ def read_file_content(file_path: str, query: str, max_chars: int = 3000) -> str:
                 return extracted_content[:max_chars] + f"\n\n... (truncated)"
         
         # Otherwise just truncate from the beginning
-        if len(content) > max_chars:
-            content = content[:max_chars] + f"\n\n... (truncated, {len(content) - max_chars} more characters)"
+        content = '\n'.join(head_lines)
+        if total_chars > max_chars:
+            content = content[:max_chars] + f"\n\n... (truncated, {total_chars - max_chars} more characters)"
         
         return content
         
@@ -144,28 +372,184 @@ def read_file_content(file_path: str, query: str, max_chars: int = 3000) -> str:
         logging.error(f"Error reading file {file_path}: {e}")
         return f"*Error reading file: {e}*"
 
+# -----------------------
+# EMBEDDING CACHE
+# -----------------------
+class EmbedCache:
+    """
+    On-disk, content-addressed cache of query embeddings.
+    Keys include the embedding model so switching EMBEDDING_MODEL never
+    returns vectors from a different model.
+    """
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def key(text: str, model: str) -> bytes:
+        return hashlib.blake2b(text.encode() + b"\0" + model.encode(), digest_size=32).digest()
+
+    def get(self, key: bytes):
+        row = self.conn.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32)
+
+    def put(self, key: bytes, vector) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+            (key, np.asarray(vector, dtype=np.float32).tobytes())
+        )
+        self.conn.commit()
+
+try:
+    embed_cache = EmbedCache(EMBED_CACHE_PATH)
+    logging.debug("Embedding cache initialized successfully")
+except sqlite3.Error as e:
+    logging.error(f"Failed to open embedding cache, continuing without it: {e}")
+    embed_cache = None
+
 # -----------------------
 # EMBEDDING
 # -----------------------
 def embed(text: str):
     logging.debug(f"Embedding text: {text[:100]}...")
+    key = EmbedCache.key(text, EMBEDDING_MODEL)
+    if embed_cache is not None:
+        try:
+            cached = embed_cache.get(key)
+        except sqlite3.Error as e:
+            logging.error(f"Failed to read embedding from cache: {e}")
+            cached = None
+        if cached is not None:
+            logging.debug("Embedding cache hit")
+            return cached
+
     response = lm_client.embeddings.create(model=EMBEDDING_MODEL, input=text)
-    return response.data[0].embedding
+    vector = np.asarray(response.data[0].embedding, dtype=np.float32)
+    
+    if embed_cache is not None:
+        try:
+            embed_cache.put(key, vector)
+        except sqlite3.Error as e:
+            logging.error(f"Failed to store embedding in cache: {e}")
+    
+    return vector
+
+def warm_up_embeddings():
+    """
+    Make LM Studio load the embedding model and open a pooled connection
+    before the first real query. Bypasses the embedding cache on purpose.
+    """
+    try:
+        lm_client.embeddings.create(model=EMBEDDING_MODEL, input="warmup")
+        logging.debug("Embedding model warmed up")
+    except Exception as e:
+        logging.warning(f"Embedding warm-up failed: {e}")
+
+# -----------------------
+# QUERY RESULT CACHE
+# -----------------------
+class QueryResultCache:
+    """
+    In-process LRU of formatted query results keyed by (query, top_k).
+    Also serves "semantic" hits: a new query whose embedding is close enough
+    to a cached query's embedding, and whose ECS/rendering flags match (so
+    the same path rules apply), reuses that query's results.
+    Entries expire after ttl seconds so edited source files show up again.
+    """
+
+    def __init__(self, max_size: int, threshold: float, ttl: float):
+        self.max_size = max_size
+        self.threshold = threshold
+        self.ttl = ttl
+        self.entries = OrderedDict()  # (query, top_k) -> (unit vector, flags, results, stored_at)
+        self.keys = []
+        self.matrix = None  # Stacked unit vectors, row i belongs to keys[i]
+
+    def _expired(self, entry) -> bool:
+        return time.monotonic() - entry[3] > self.ttl
+
+    def get(self, query: str, top_k: int):
+        entry = self.entries.get((query, top_k))
+        if entry is None or self._expired(entry):
+            return None
+        self.entries.move_to_end((query, top_k))
+        return entry[2]
+
+    def get_similar(self, vector, flags: tuple[bool, bool], top_k: int):
+        if self.matrix is None:
+            return None
+        unit = _normalize(vector)
+        if unit.shape[0] != self.matrix.shape[1]:
+            return None
+        scores = self.matrix @ unit
+        for i in np.argsort(scores)[::-1]:
+            if scores[i] < self.threshold:
+                break
+            key = self.keys[i]
+            entry = self.entries[key]
+            # A cached result set can serve any request that needs no more
+            # results and filters paths the same way
+            if key[1] >= top_k and entry[1] == flags and not self._expired(entry):
+                self.entries.move_to_end(key)
+                logging.debug(f"Semantic cache hit on {key[0][:100]!r} (similarity {scores[i]:.4f})")
+                return entry[2][:int(top_k)]
+        return None
+
+    def put(self, query: str, top_k: int, vector, flags: tuple[bool, bool], results: list) -> None:
+        if self.max_size <= 0:
+            return
+        self.entries[(query, top_k)] = (_normalize(vector), flags, results, time.monotonic())
+        self.entries.move_to_end((query, top_k))
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        self.keys = list(self.entries.keys())
+        self.matrix = np.stack([entry[0] for entry in self.entries.values()])
+
+def _normalize(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+query_cache = QueryResultCache(QUERY_CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD, QUERY_CACHE_TTL)
 
 # -----------------------
 # QUERY FUNCTION WITH FILTERING
 # -----------------------
 def query_qdrant(text: str, top_k: int = 5):
     logging.debug(f"Querying Qdrant with text: {text[:100]}, top_k: {top_k}")
+    cached = query_cache.get(text, top_k)
+    if cached is not None:
+        logging.debug("Query cache hit")
+        return cached
+    
     vector = embed(text)
+    flags = query_flags(text)
+    
+    cached = query_cache.get_similar(vector, flags, top_k)
+    if cached is not None:
+        return cached
     
-    # Request more results than needed so we can filter
-    search_limit = top_k * 3
+    query_has_ecs, query_has_rendering = flags
+    
+    # Score filtering happens server-side. Examples are only rejected when the
+    # query has no ECS/rendering terms; otherwise every path passes
+    # is_relevant_file, so only then request more results than needed
+    if query_has_ecs or query_has_rendering:
+        search_limit = top_k
+    else:
+        search_limit = top_k * 3
     
     try:
         results = qdrant.query_points(
             collection_name=COLLECTION,
             query=vector,
+            score_threshold=MIN_RELEVANCE_SCORE,
             limit=search_limit
         ).points
         logging.debug(f"query_points successful, got {len(results)} results")
@@ -175,6 +559,7 @@ def query_qdrant(text: str, top_k: int = 5):
             results = qdrant.search(
                 collection_name=COLLECTION,
                 query_vector=vector,
+                score_threshold=MIN_RELEVANCE_SCORE,
                 limit=search_limit
             )
             logging.debug(f"search successful, got {len(results)} results")
@@ -183,12 +568,13 @@ def query_qdrant(text: str, top_k: int = 5):
             results = qdrant.search_points(
                 collection_name=COLLECTION,
                 query_vector=vector,
+                score_threshold=MIN_RELEVANCE_SCORE,
                 limit=search_limit
             )
             logging.debug(f"search_points successful, got {len(results)} results")
     
-    # Filter and rank results
-    formatted_results = []
+    # Filter and rank results, keeping only the first top_k relevant candidates
+    candidates = []
     for r in results:
         file_path = r.payload.get("path", "Unknown")
         score = r.score
@@ -199,28 +585,37 @@ def query_qdrant(text: str, top_k: int = 5):
             continue
         
         # Check if file is relevant based on path and query
-        is_relevant, reason = is_relevant_file(file_path, text)
+        is_relevant, reason = is_relevant_file(file_path, query_has_ecs, query_has_rendering)
         
         if is_relevant:
-            # Read the actual file content with smart extraction
-            content = read_file_content(file_path, text)
-            
-            result_data = {
-                "path": file_path,
-                "score": score,
-                "content": content,
-                "relevance_reason": reason
-            }
-            
-            formatted_results.append(result_data)
+            candidates.append((file_path, score, reason))
             
             # Stop when we have enough relevant results
-            if len(formatted_results) >= top_k:
+            if len(candidates) >= top_k:
                 break
         else:
             logging.debug(f"Filtered out {file_path}: {reason}")
     
+    # Read the actual file contents concurrently; the reads are independent
+    # and release the GIL while blocked on disk
+    formatted_results = []
+    if candidates:
+        with ThreadPoolExecutor(max_workers=min(FILE_READ_WORKERS, len(candidates))) as executor:
+            contents = list(executor.map(
+                lambda candidate: read_file_content(candidate[0], text),
+                candidates
+            ))
+        
+        for (file_path, score, reason), content in zip(candidates, contents):
+            formatted_results.append({
+                "path": file_path,
+                "score": score,
+                "content": content,
+                "relevance_reason": reason
+            })
+    
     logging.debug(f"Returning {len(formatted_results)} filtered results")
+    query_cache.put(text, top_k, vector, flags, formatted_results)
     return formatted_results
 
 # -----------------------
@@ -324,6 +719,23 @@ def handle_call_tool(request):
 # -----------------------
 # MCP LOOP
 # -----------------------
+# Messages are read and written as raw UTF-8 bytes, skipping the text
+# layer's per-message decode/encode. Logs only decode a short prefix.
+stdin_buf = sys.stdin.buffer
+stdout_buf = sys.stdout.buffer
+LOG_MESSAGE_CHARS = 500
+
+def _log_preview(message: bytes) -> str:
+    preview = message[:LOG_MESSAGE_CHARS].decode('utf-8', errors='replace').strip()
+    if len(message) > LOG_MESSAGE_CHARS:
+        preview += f"... ({len(message)} bytes)"
+    return preview
+
+def write_message(message: bytes):
+    stdout_buf.write(message)
+    stdout_buf.write(b'\n')
+    stdout_buf.flush()
+
 def mcp_loop():
     logging.debug("Entering MCP loop")
     while True:
@@ -331,14 +743,14 @@ def mcp_loop():
         req_id = 1
         
         try:
-            line = sys.stdin.readline()
+            line = stdin_buf.readline()
             if not line:
                 logging.debug("EOF received, exiting")
                 break
             
-            logging.debug(f"Received line: {line.strip()}")
+            logging.debug(f"Received line: {_log_preview(line)}")
             
-            request = json.loads(line)
+            request = json_loads(line)
             req_id = request.get("id", 1)
             method = request.get("method")
             
@@ -365,9 +777,9 @@ def mcp_loop():
                 "result": result
             }
             
-            response_json = json.dumps(response)
-            logging.debug(f"Sending response: {response_json}")
-            print(response_json, flush=True)
+            response_json = json_dumps(response)
+            logging.debug(f"Sending response: {_log_preview(response_json)}")
+            write_message(response_json)
             
         except json.JSONDecodeError as e:
             logging.error(f"JSON decode error: {e}", exc_info=True)
@@ -383,12 +795,14 @@ def mcp_loop():
                     "message": str(e)
                 }
             }
-            response_json = json.dumps(response)
-            logging.debug(f"Sending error response: {response_json}")
-            print(response_json, flush=True)
+            response_json = json_dumps(response)
+            logging.debug(f"Sending error response: {_log_preview(response_json)}")
+            write_message(response_json)
 
 if __name__ == "__main__":
     logging.debug("Starting MCP server main")
+    # Warm up in the background so the initialize handshake isn't delayed
+    threading.Thread(target=warm_up_embeddings, daemon=True).start()
     try:
         mcp_loop()
     except Exception as e:
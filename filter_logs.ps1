@@ -20,45 +20,60 @@ if (-not (Test-Path $InputPath)) {
     exit 1
 }
 
-# Read and filter lines
+# Stream and filter lines. A while loop over ReadLine() avoids the per-line
+# pipeline and script block overhead of Get-Content | ForEach-Object.
+# The file is opened with FileShare.ReadWrite, as Get-Content does, so a log
+# the client still has open for writing can be filtered while it runs.
+# All prefix and substring searches are ordinal: the string overloads of
+# StartsWith/IndexOf are culture-sensitive and much slower per line.
 $counter = 0
-Get-Content $InputPath | Where-Object {
-    $_.StartsWith("2026")
-} | ForEach-Object {
-    $line = $_.Substring(28).TrimStart()
+$stream = [System.IO.FileStream]::new($InputPath, 'Open', 'Read', 'ReadWrite')
+$reader = [System.IO.StreamReader]::new($stream)
+try {
+    :lines while ($null -ne ($rawLine = $reader.ReadLine())) {
+        if (-not $rawLine.StartsWith("2026", [StringComparison]::Ordinal) -or $rawLine.Length -lt 28) {
+            continue
+        }
+
+        $line = $rawLine.Substring(28).TrimStart()
 
-    # Check for log level keywords in first 6 characters
-    foreach ($level in @("INFO", "DEBUG", "WARN", "ERROR")) {
-        if ($line.StartsWith($level)) {
-            # Find the space after the log level
-            $spaceIndex = $line.IndexOf(" ", [ StringComparison]::Ordinal)
-            if ($spaceIndex -ge 0) {
-                # Remove from log level to first space (inclusive)
-                $line = $line.Substring($spaceIndex + 1)
-                break
-            } else {
-                # No space found, return empty
-                return ""
+        # Check for log level keywords in first 6 characters
+        foreach ($level in @("INFO", "DEBUG", "WARN", "ERROR")) {
+            if ($line.StartsWith($level, [StringComparison]::Ordinal)) {
+                # Find the space after the log level
+                $spaceIndex = $line.IndexOf(" ", [ StringComparison]::Ordinal)
+                if ($spaceIndex -ge 0) {
+                    # Remove from log level to first space (inclusive)
+                    $line = $line.Substring($spaceIndex + 1)
+                    break
+                } else {
+                    # No space found, return empty
+                    ""
+                    continue lines
+                }
             }
         }
-    }
 
-    # Trim everything up to and including the first ": "
-    $colonSpaceIndex = $line.IndexOf(": ")
-    if ($colonSpaceIndex -ge 0) {
-        $line = $line.Substring($colonSpaceIndex + 2)
-    }
+        # Trim everything up to and including the first ": "
+        $colonSpaceIndex = $line.IndexOf(": ", [StringComparison]::Ordinal)
+        if ($colonSpaceIndex -ge 0) {
+            $line = $line.Substring($colonSpaceIndex + 2)
+        }
 
-    # Check if line matches the match string (if specified)
-    if ($Match -and -not $line.Contains($Match)) {
-        return
-    }
+        # Check if line matches the match string (if specified)
+        if ($Match -and $line.IndexOf($Match, [StringComparison]::Ordinal) -lt 0) {
+            continue
+        }
 
-    # Check if we've reached max items limit
-    $counter++
-    if ($MaxItems -gt 0 -and $counter -gt $MaxItems) {
-        return
-    }
+        # Stop reading once the max items limit is reached; lines are emitted
+        # as they are found, so nothing is buffered for the rest of the file
+        $counter++
+        if ($MaxItems -gt 0 -and $counter -gt $MaxItems) {
+            break
+        }
 
-    return $line
+        $line
+    }
+} finally {
+    $reader.Dispose()
 }
\ No newline at end of file